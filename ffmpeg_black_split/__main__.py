@@ -10,8 +10,16 @@ import json
 import logging
 import os
 import sys
+from typing import Optional, Tuple
 
-from .__init__ import __version__ as version
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+from . import __version__ as version
 from ._black_split import FfmpegBlackSplit
 from ._log import CustomLogFormatter
 
@@ -32,6 +40,49 @@ def setup_logger(level: int = logging.INFO) -> logging.Logger:
     return logger
 
 
+def dump_json(obj) -> str:
+    # orjson is much faster for long lists of periods, but optional
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2)
+
+
+def jobs(value: str) -> int:
+    n_jobs = int(value)
+    if n_jobs < 1:
+        raise argparse.ArgumentTypeError(
+            f"number of jobs must be at least 1, got {n_jobs}"
+        )
+    return n_jobs
+
+
+def ffmpeg_threads(value: str) -> int:
+    threads = int(value)
+    if not 1 <= threads <= 64:
+        raise argparse.ArgumentTypeError(
+            f"number of threads must be between 1 and 64, got {threads}"
+        )
+    return threads
+
+
+def blackdetect_scale(value: str) -> Optional[Tuple[int, int]]:
+    if value in ("off", "0"):
+        return None
+    try:
+        if "x" in value:
+            width, height = (int(v) for v in value.split("x"))
+        else:
+            # keep the aspect ratio, with an even height
+            width, height = int(value), -2
+        if width <= 0 or (height <= 0 and height != -2):
+            raise ValueError
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"scale must be given as WIDTHxHEIGHT, WIDTH or 'off', got {value}"
+        )
+    return width, height
+
+
 def main():
     parser = argparse.ArgumentParser(
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -59,6 +110,33 @@ def main():
         default=0.10,
         help="Set the threshold for considering a pixel 'black'",
     )
+    parser.add_argument(
+        "--blackdetect-scale",
+        "--detect-scale",
+        type=blackdetect_scale,
+        default="320x180",
+        help="Downscale the video to WIDTHxHEIGHT (or to WIDTH, keeping the aspect ratio) before detecting black "
+        "periods, which is much faster for high-resolution inputs. Use 'off' or 0 to detect on the original video.",
+    )
+    parser.add_argument(
+        "--detect-keyframes-only",
+        action="store_true",
+        help="Only decode keyframes when detecting black periods. This is much faster, but the start and end of "
+        "the black periods are only found at the keyframes, so use it only with a --black-min-duration well above "
+        "the keyframe interval.",
+    )
+    parser.add_argument(
+        "--hwaccel",
+        choices=["auto", "none", "cuda", "vaapi", "qsv", "videotoolbox"],
+        help="Use hardware decoding for detecting black periods. This can speed up the detection considerably "
+        "for high-resolution inputs. If it fails, the detection is retried with software decoding.",
+    )
+    parser.add_argument(
+        "--detect-with-ffprobe",
+        action="store_true",
+        help="Detect black periods with ffprobe, reading the blackdetect frame metadata instead of parsing the ffmpeg "
+        "log. Does not support --progress or --hwaccel.",
+    )
     parser.add_argument(
         "-o",
         "--output-directory",
@@ -73,11 +151,60 @@ def main():
     parser.add_argument(
         "--no-split", action="store_true", help="Don't split the video into segments."
     )
+    parser.add_argument(
+        "--emit-edl",
+        metavar="EDL_FILE",
+        help="Don't split the video, but write an ffconcat edit list of the content periods in the input file to "
+        "EDL_FILE. Play it with 'ffplay -f concat -safe 0 -i EDL_FILE'.",
+    )
     parser.add_argument(
         "--no-copy",
         action="store_true",
         help="Don't stream-copy, but re-encode the video. This is useful in case of conversion errors when using different output formats.",
     )
+    parser.add_argument(
+        "--no-accurate-seek",
+        action="store_true",
+        help="When re-encoding, start each segment at the keyframe before its start time instead of exactly at it. "
+        "This is faster, since the frames in between don't need to be decoded. Has no effect when a single "
+        "ffmpeg process re-encodes all segments, i.e. with --jobs 1 and four or more segments.",
+    )
+    parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help="Cut all segments in a single ffmpeg pass using the segment muxer, instead of one ffmpeg process per segment. "
+        "Only applies when stream-copying. The input is only split at keyframes, so segments are extended to the "
+        "surrounding keyframes.",
+    )
+    parser.add_argument(
+        "--cut-during-detection",
+        action="store_true",
+        help="Start cutting each segment as soon as its end has been detected, instead of waiting for the detection "
+        "to finish. Cannot be combined with --single-pass.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=jobs,
+        default=os.environ.get("FFMPEG_BLACK_SPLIT_JOBS"),
+        help="Number of segments to cut in parallel. Can also be set via the FFMPEG_BLACK_SPLIT_JOBS environment "
+        "variable. Default is half the number of CPU cores.",
+    )
+    parser.add_argument(
+        "--ffmpeg-threads-per-invocation",
+        "--ffmpeg-threads",
+        type=ffmpeg_threads,
+        default=os.environ.get("FFMPEG_BLACK_SPLIT_THREADS"),
+        help="Number of threads each ffmpeg process may use (1-64), for both detecting and cutting. Can also be set "
+        "via the FFMPEG_BLACK_SPLIT_THREADS environment variable. Default is the number of CPU cores divided by the "
+        "number of jobs when cutting, and up to ffmpeg otherwise.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or write cached black periods. By default, detected black periods are cached in "
+        "$XDG_CACHE_HOME/ffmpeg-black-split and reused for the same input file and detection options.",
+    )
     parser.add_argument(
         "-p", "--progress", action="store_true", help="Show a progress bar on stderr"
     )
@@ -90,41 +217,86 @@ def main():
 
     cli_args = parser.parse_args()
 
+    if cli_args.cut_during_detection and cli_args.single_pass:
+        parser.error("--cut-during-detection cannot be combined with --single-pass")
+    if cli_args.cut_during_detection and cli_args.emit_edl:
+        parser.error("--cut-during-detection cannot be combined with --emit-edl")
+
     logger = setup_logger(level=logging.DEBUG if cli_args.verbose else logging.INFO)
 
-    ffbs = FfmpegBlackSplit(cli_args.input, progress=cli_args.progress)
+    output_directory = (
+        cli_args.output_directory if cli_args.output_directory else os.getcwd()
+    )
 
-    ffbs.detect_black_periods(
-        black_min_duration=cli_args.black_min_duration,
-        picture_black_ratio_th=cli_args.picture_black_ratio_th,
-        pixel_black_th=cli_args.pixel_black_th,
+    ffbs = FfmpegBlackSplit(
+        cli_args.input,
+        progress=cli_args.progress,
+        use_cache=not cli_args.no_cache,
+        hwaccel=None if cli_args.hwaccel == "none" else cli_args.hwaccel,
+        blackdetect_scale=cli_args.blackdetect_scale,
+        keyframes_only=cli_args.detect_keyframes_only,
+        use_ffprobe=cli_args.detect_with_ffprobe,
     )
 
+    if cli_args.cut_during_detection and not cli_args.no_split:
+        ffbs.detect_and_cut_all_periods(
+            output_directory=output_directory,
+            black_min_duration=cli_args.black_min_duration,
+            picture_black_ratio_th=cli_args.picture_black_ratio_th,
+            pixel_black_th=cli_args.pixel_black_th,
+            extension=cli_args.output_extension,
+            no_copy=cli_args.no_copy,
+            max_workers=cli_args.jobs,
+            threads=cli_args.ffmpeg_threads_per_invocation,
+            accurate_seek=not cli_args.no_accurate_seek,
+        )
+    else:
+        ffbs.detect_black_periods(
+            black_min_duration=cli_args.black_min_duration,
+            picture_black_ratio_th=cli_args.picture_black_ratio_th,
+            pixel_black_th=cli_args.pixel_black_th,
+            threads=cli_args.ffmpeg_threads_per_invocation or 0,
+        )
+
     if not len(ffbs.black_periods):
         logger.error("No black periods detected, nothing to split.")
         exit(1)
 
     logger.debug("Black and content periods detected:")
     print(
-        json.dumps(
+        dump_json(
             {
                 "black_periods": ffbs.black_periods,
                 "content_periods": ffbs.content_periods,
-            },
-            indent=2,
+            }
         )
     )
 
-    if not cli_args.no_split:
-        # cut the individual periods to files
-        ffbs.cut_all_periods(
-            output_directory=(
-                cli_args.output_directory if cli_args.output_directory else os.getcwd()
-            ),
-            extension=cli_args.output_extension,
-            no_copy=cli_args.no_copy,
-            progress=cli_args.progress,
-        )
+    if cli_args.emit_edl:
+        ffbs.export_edl(cli_args.emit_edl)
+    elif not cli_args.no_split and not cli_args.cut_during_detection:
+        if cli_args.single_pass and not cli_args.no_copy:
+            ffbs.cut_all_periods_segmented(
+                output_directory=output_directory,
+                extension=cli_args.output_extension,
+                progress=cli_args.progress,
+            )
+        else:
+            if cli_args.single_pass:
+                logger.warning(
+                    "--single-pass only works with stream copy, cutting segments individually"
+                )
+
+            # cut the individual periods to files
+            ffbs.cut_all_periods(
+                output_directory=output_directory,
+                extension=cli_args.output_extension,
+                no_copy=cli_args.no_copy,
+                progress=cli_args.progress,
+                max_workers=cli_args.jobs,
+                threads=cli_args.ffmpeg_threads_per_invocation,
+                accurate_seek=not cli_args.no_accurate_seek,
+            )
 
 
 if __name__ == "__main__":
@@ -1,17 +1,326 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import os
+import platform
 import re
 import shlex
+import shutil
+import subprocess
 import sys
-from typing import Literal, Optional, TypedDict, Union
+import tempfile
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Literal, Optional, TypedDict, Union
 
 from ffmpeg_progress_yield import FfmpegProgress
 from tqdm import tqdm
 
 logger = logging.getLogger("ffmpeg-black-split")
 
+# resolved once, instead of searching $PATH for every ffmpeg process
+FFMPEG_BIN = os.environ.get("FFMPEG_BIN") or shutil.which("ffmpeg") or "ffmpeg"
+FFPROBE_BIN = os.environ.get("FFPROBE_BIN") or shutil.which("ffprobe") or "ffprobe"
+
+# containers that carry the codec parameters in their headers, so ffmpeg does not
+# need to read (and decode) much of the input to find the stream info
+_HEADER_PROBED_EXTENSIONS = {".mp4", ".m4v", ".mov", ".mkv", ".webm"}
+
+# Python launches a process with posix_spawn() instead of fork() + exec(), which does not copy the
+# parent's memory mappings, only if it does not need to close inherited file descriptors (its own
+# are non-inheritable anyway), no preexec_fn is set, and the executable is a path, like FFMPEG_BIN
+_POPEN_KWARGS: dict[str, Any] = {"close_fds": False}
+
+# from this number of periods on, re-encode them with a single ffmpeg process instead of one per period
+_SINGLE_PROCESS_MIN_CUTS = 4
+
+# minimum change in percent, or time in seconds, between progress bar updates
+_PROGRESS_MIN_STEP = 1.0
+_PROGRESS_MIN_INTERVAL = 0.25
+
+# number of last ffmpeg log lines to keep for error messages
+_STDERR_TAIL_LINES = 20
+
+# the input duration as printed by ffmpeg, e.g. "Duration: 00:01:23.45, start: ..."
+_DURATION_REGEX = re.compile(r"Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+# e.g. "ffmpeg version 7.1.1-static" or "ffmpeg version n6.0"; development builds
+# ("ffmpeg version N-112345-g...") do not match and are assumed to be recent
+_FFMPEG_VERSION_REGEX = re.compile(r"ffmpeg version n?(\d+)\.(\d+)")
+
+# first ffmpeg version with the x86 SIMD (AVX2) implementation of blackdetect
+_BLACKDETECT_SIMD_VERSION = (8, 0)
+
+# segments written by the segment muxer that overlap a period by less than this are not part of it
+_SEGMENT_TIME_TOLERANCE = 0.001
+
+# content shorter than this at the end of the input, after the last black period, is ignored
+_END_TOLERANCE = 0.5
+
+# characters with a special meaning in filter option values, and in filter graphs
+_FILTER_VALUE_SPECIAL_CHARS = re.compile(r"([\\':])")
+_FILTER_GRAPH_SPECIAL_CHARS = re.compile(r"([\\'\[\],;])")
+
+
+def _escape_filter_value(value: str) -> str:
+    """
+    Escape a value to be used as a filter option in a filter graph,
+    e.g. a file name for the movie filter.
+
+    Args:
+        value (str): The value to escape.
+
+    Returns:
+        str: The escaped value.
+    """
+    value = _FILTER_VALUE_SPECIAL_CHARS.sub(r"\\\1", value)
+    return _FILTER_GRAPH_SPECIAL_CHARS.sub(r"\\\1", value)
+
+
+def _default_max_workers() -> int:
+    """
+    Get the default number of ffmpeg processes to run in parallel.
+
+    Each ffmpeg process uses several threads itself, and the processes share the disk
+    bandwidth, so using half of the CPU cores leaves room for both.
+
+    Returns:
+        int: Number of parallel ffmpeg processes.
+    """
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+def _ffmpeg_threads_per_invocation(n_workers: int) -> int:
+    """
+    Get the number of threads each ffmpeg process should use so that
+    n_workers parallel processes do not oversubscribe the CPU cores.
+
+    Args:
+        n_workers (int): Number of ffmpeg processes running in parallel.
+
+    Returns:
+        int: Number of threads per ffmpeg process.
+    """
+    return max(1, (os.cpu_count() or n_workers) // n_workers)
+
+
+def _ends_at(time: float, duration: Optional[float]) -> bool:
+    """
+    Check whether a time is at the end of the input, so that there is no content after it.
+
+    Args:
+        time (float): Time in seconds.
+        duration (Optional[float]): Duration of the input in seconds, if known.
+
+    Returns:
+        bool: True if the time is at the end of the input.
+    """
+    # blackdetect reports the timestamp of the last black frame, not its end
+    return duration is not None and duration - time < _END_TOLERANCE
+
+
+def _probe_args(input_file: str) -> list[str]:
+    """
+    Get ffmpeg input options that limit stream probing for containers where it is not needed.
+
+    Args:
+        input_file (str): Input file.
+
+    Returns:
+        list: List of ffmpeg options to put before the input.
+    """
+    if os.path.splitext(input_file)[1].lower() not in _HEADER_PROBED_EXTENSIONS:
+        return []
+    # note that an -analyzeduration of 0 means "use the default" to ffmpeg
+    return ["-probesize", "1M", "-analyzeduration", "1000000"]
+
+
+def _codec_args(no_copy: bool) -> list[str]:
+    """
+    Get the ffmpeg codec options for cutting.
+
+    Args:
+        no_copy (bool): Do not copy the streams, reencode them.
+
+    Returns:
+        list: List of ffmpeg output options.
+    """
+    if no_copy:
+        # TODO: allow setting codec
+        return ["-c:v", "libx264", "-c:a", "aac"]
+    return ["-c", "copy"]
+
+
+def _map_args(extension: str) -> list[str]:
+    """
+    Get the ffmpeg stream mapping options for cutting.
+
+    Args:
+        extension (str): Output extension.
+
+    Returns:
+        list: List of ffmpeg output options.
+    """
+    # see https://github.com/slhck/ffmpeg-black-split/issues/3
+    ignore_data_args = (
+        [
+            "-map",
+            "-0:d",  # ignore data streams
+        ]
+        if extension == "mkv"
+        else []
+    )
+    return ["-map", "0", *ignore_data_args]
+
+
+def _output_prefix(input_file: str) -> str:
+    """
+    Get the prefix of the files that parts of the input are cut to, i.e. its name without extension.
+
+    Args:
+        input_file (str): Input file.
+
+    Returns:
+        str: The prefix.
+    """
+    return os.path.splitext(os.path.basename(input_file))[0]
+
+
+def _output_file(
+    output_directory: str,
+    prefix: str,
+    start: float,
+    end: Union[float, None, Literal[""]],
+    extension: str,
+) -> str:
+    """
+    Get the path of the file a part of the input is cut to, i.e. <prefix>_<start>-<end>.<extension>.
+
+    Args:
+        output_directory (str): Output directory.
+        prefix (str): Prefix of the file name, see `_output_prefix`.
+        start (float): Start time.
+        end (Union[float, None, Literal[""]]): End time, or None or "" for an open-ended part.
+        extension (str): Output extension.
+
+    Returns:
+        str: Path of the output file.
+    """
+    suffix = f"{start}-{'' if end is None else end}.{extension}"
+    return os.path.join(output_directory, f"{prefix}_{suffix}")
+
+
+def _run_ffmpeg(
+    cmd: list[str],
+    progress: bool = False,
+    stderr_callback: Optional[Callable[[str], None]] = None,
+):
+    """
+    Run an ffmpeg command.
+
+    Without a progress bar, ffmpeg is run directly instead of through FfmpegProgress,
+    which would parse every line of its output for the progress.
+
+    Args:
+        cmd (list[str]): The command to run.
+        progress (bool, optional): Show progress bar. Defaults to False.
+        stderr_callback (Optional[Callable[[str], None]], optional): Function called with each line of output.
+    """
+    cmd_q = " ".join([shlex.quote(c) for c in cmd])
+    logger.debug("Running ffmpeg command: {}".format(cmd_q))
+
+    if not progress:
+        if stderr_callback is not None:
+            _run_ffmpeg_streaming(cmd, stderr_callback)
+        else:
+            _run_ffmpeg_quietly(cmd)
+        return
+
+    ff = FfmpegProgress(cmd)
+    if stderr_callback is not None:
+        ff.set_stderr_callback(stderr_callback)
+
+    # ffmpeg reports its progress many times per second, so only redraw
+    # the bar when there is a visible change or some time has passed
+    with tqdm(total=100, position=1) as pbar:
+        last_update = time.monotonic()
+        for p in ff.run_command_with_progress(popen_kwargs=_POPEN_KWARGS):
+            now = time.monotonic()
+            if (
+                p - pbar.n >= _PROGRESS_MIN_STEP
+                or now - last_update >= _PROGRESS_MIN_INTERVAL
+                or p == 100
+            ):
+                pbar.update(p - pbar.n)
+                last_update = now
+
+
+def _run_ffmpeg_streaming(cmd: list[str], stderr_callback: Callable[[str], None]):
+    """
+    Run an ffmpeg command, passing each line of its log to a function as soon as ffmpeg writes it.
+
+    Unlike FfmpegProgress, this does not keep the whole log in memory, only the last lines for the error message.
+
+    Args:
+        cmd (list[str]): The command to run.
+        stderr_callback (Callable[[str], None]): Function called with each line of output.
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+    """
+    stderr_tail: deque[str] = deque(maxlen=_STDERR_TAIL_LINES)
+
+    with subprocess.Popen(
+        [cmd[0], "-nostats", *cmd[1:]],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        errors="replace",
+        **_POPEN_KWARGS,
+    ) as proc:
+        assert proc.stderr is not None
+        for line in proc.stderr:
+            line = line.strip()
+            stderr_callback(line)
+            stderr_tail.append(line)
+
+    if proc.returncode != 0:
+        raise RuntimeError(
+            "Error running command {}: {}".format(cmd, "\n".join(stderr_tail))
+        )
+
+
+def _run_ffmpeg_quietly(cmd: list[str]):
+    """
+    Run an ffmpeg command whose output is not needed, only keeping its error messages.
+
+    Args:
+        cmd (list[str]): The command to run.
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+    """
+    result = subprocess.run(
+        [cmd[0], "-nostats", "-loglevel", "error", *cmd[1:]],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        errors="replace",
+        **_POPEN_KWARGS,
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(
+            "Error running command {}: {}".format(cmd, result.stderr.strip())
+        )
+
 
 class Period(TypedDict):
     """
@@ -38,23 +347,57 @@ class FfmpegBlackSplit:
     DEFAULT_PICTURE_BLACK_RATIO_TH = 0.98
     DEFAULT_PIXEL_BLACK_TH = 0.10
 
-    def __init__(self, input_file: str, progress: bool = False):
+    _blackdetect_simd_checked = False
+
+    def __init__(
+        self,
+        input_file: str,
+        progress: bool = False,
+        use_cache: bool = False,
+        hwaccel: Optional[str] = None,
+        blackdetect_scale: Optional[tuple[int, int]] = (320, 180),
+        use_ffprobe: bool = False,
+        keyframes_only: bool = False,
+    ):
         """
         Args:
             input_file (str): Input file.
             progress (bool, optional): Show progress bar. Defaults to False.
+            use_cache (bool, optional): Cache detected black periods on disk (in $XDG_CACHE_HOME/ffmpeg-black-split),
+                                        and reuse them for the same input file and options. Defaults to False.
+            hwaccel (Optional[str], optional): Hardware acceleration method to decode the input with when detecting
+                                               black periods, e.g. "auto", "cuda" or "vaapi". Defaults to None.
+            blackdetect_scale (Optional[tuple[int, int]], optional): Width and height to downscale the video to before
+                                                                     detecting black periods (a height of -2 keeps
+                                                                     the aspect ratio), or None to use the original
+                                                                     size. Defaults to (320, 180).
+            use_ffprobe (bool, optional): Detect black periods with ffprobe, reading the frame metadata that
+                                          blackdetect sets instead of parsing the ffmpeg log. This does not
+                                          support progress bars or hardware decoding. Defaults to False.
+            keyframes_only (bool, optional): Only decode the keyframes when detecting black periods, which is much
+                                             faster, but only finds the start and end of black periods at keyframes.
+                                             Not supported with ffprobe. Defaults to False.
         """
         self.input_file = input_file
+        self._output_prefix = _output_prefix(input_file)
         self.black_periods: list[Period] = []
         self.content_periods: list[Union[Period, OpenPeriod]] = []
+        self.duration: Optional[float] = None
 
         self.progress = progress
+        self.use_cache = use_cache
+        self.hwaccel = hwaccel
+        self.blackdetect_scale = blackdetect_scale
+        self.use_ffprobe = use_ffprobe
+        self.keyframes_only = keyframes_only
 
     def detect_black_periods(
         self,
         black_min_duration=DEFAULT_BLACK_MIN_DURATION,
         picture_black_ratio_th=DEFAULT_PICTURE_BLACK_RATIO_TH,
         pixel_black_th=DEFAULT_PIXEL_BLACK_TH,
+        on_black_period: Optional[Callable[[Period], None]] = None,
+        threads: int = 0,
     ) -> list[Period]:
         """
         Get black periods from ffmpeg.
@@ -64,12 +407,13 @@ class FfmpegBlackSplit:
                                                   It must be a non-negative floating point number.
             picture_black_ratio_th (float, optional): Set the threshold for considering a picture 'black'.
             pixel_black_th (float, optional): Set the threshold for considering a pixel 'black'.
+            on_black_period (Optional[Callable[[Period], None]], optional): Function called with each black period
+                                                                           as soon as ffmpeg reports it.
+            threads (int, optional): Number of threads for ffmpeg to use. Defaults to 0 (let ffmpeg decide).
 
         Returns:
             list: List of black periods.
         """
-        black_periods: list[Period] = []
-
         blackdetect_option_pairs = {
             "black_min_duration": black_min_duration,
             "picture_black_ratio_th": picture_black_ratio_th,
@@ -80,91 +424,539 @@ class FfmpegBlackSplit:
             f"{key}={value}" for key, value in blackdetect_option_pairs.items()
         ]
 
-        try:
-            cmd = [
-                "ffmpeg",
-                "-hide_banner",
-                "-y",
-                "-i",
-                self.input_file,
-                "-vf",
-                f"blackdetect={':'.join(blackdetect_options)}",
-                "-an",
-                "-f",
-                "null",
-                "-",
-            ]
+        video_filter = f"blackdetect={':'.join(blackdetect_options)}"
 
-            cmd_q = " ".join([shlex.quote(c) for c in cmd])
-            logger.debug("Running ffmpeg command: {}".format(cmd_q))
-
-            ff = FfmpegProgress(cmd)
-            if self.progress:
-                with tqdm(total=100, position=1) as pbar:
-                    for p in ff.run_command_with_progress():
-                        pbar.update(p - pbar.n)
-            else:
-                for _ in ff.run_command_with_progress():
-                    pass
-
-            if ff.stderr is None:
-                raise Exception("No stderr from ffmpeg")
-
-            blackdetect_lines = [
-                line
-                for line in ff.stderr.splitlines()
-                if line.startswith("[blackdetect")
-            ]
+        # blackdetect only looks at the ratio of dark luma pixels, which a smaller, grayscale
+        # picture preserves, but it has far fewer pixels to check
+        if self.blackdetect_scale is not None:
+            width, height = self.blackdetect_scale
+            video_filter = (
+                f"scale={width}:{height}:flags=fast_bilinear,format=gray,{video_filter}"
+            )
 
-            if len(blackdetect_lines) == 0:
-                print("No black periods detected.", file=sys.stderr)
-                return black_periods
-
-            for line in blackdetect_lines:
-                # [blackdetect @ 0x137f36f30] black_start:20 black_end:24.96 black_duration:4.96
-                #
-                # extract the black_start, black_end and black_duration values
-                black_start: Union[float, None] = None
-                black_end: Union[float, None] = None
-                black_duration: Union[float, None] = None
-                if black_start_match := re.search(r"black_start:(\d+(?:\.\d+)?)", line):
-                    black_start = float(black_start_match.group(1))
-                if black_end_match := re.search(r"black_end:(\d+(?:\.\d+)?)", line):
-                    black_end = float(black_end_match.group(1))
-                if black_duration_match := re.search(
-                    r"black_duration:(\d+(?:\.\d+)?)", line
-                ):
-                    black_duration = float(black_duration_match.group(1))
-
-                if black_start is None or black_end is None or black_duration is None:
-                    raise Exception("Could not parse blackdetect line: {}".format(line))
-
-                black_periods.append(
-                    {
-                        "start": black_start,
-                        "end": black_end,
-                        "duration": black_duration,
-                    }
-                )
+        cache_path = self._cache_path(video_filter) if self.use_cache else None
+        cached = self._read_cache(cache_path) if cache_path is not None else None
+
+        if cached is not None:
+            logger.debug("Using cached black periods from {}".format(cache_path))
+            black_periods, duration = cached
+            if on_black_period is not None:
+                for black_period in black_periods:
+                    on_black_period(black_period)
+        elif self.use_ffprobe:
+            black_periods, duration = self._run_blackdetect_ffprobe(
+                video_filter, black_min_duration, on_black_period
+            )
+        else:
+            black_periods, duration = self._run_blackdetect(
+                video_filter, on_black_period, threads=threads
+            )
 
-        except Exception as e:
-            raise e
+        if cached is None and cache_path is not None:
+            self._write_cache(cache_path, black_periods, duration)
+
+        self.duration = duration
+
+        if len(black_periods) == 0:
+            print("No black periods detected.", file=sys.stderr)
+            return black_periods
 
         self.black_periods = black_periods
         self.content_periods = FfmpegBlackSplit.black_periods_to_content_periods(
-            self.black_periods
+            self.black_periods, duration=self.duration
         )
         return self.black_periods
 
+    def _run_blackdetect(
+        self,
+        video_filter: str,
+        on_black_period: Optional[Callable[[Period], None]] = None,
+        threads: int = 0,
+    ) -> tuple[list[Period], Optional[float]]:
+        """
+        Run ffmpeg with the blackdetect filter and parse its output.
+
+        If ffmpeg fails with hardware decoding, it is run again without it.
+
+        Args:
+            video_filter (str): The filter graph to run, ending in the blackdetect filter.
+            on_black_period (Optional[Callable[[Period], None]], optional): Function called with each black period
+                                                                           as soon as ffmpeg reports it.
+            threads (int, optional): Number of threads for ffmpeg to use. Defaults to 0 (let ffmpeg decide).
+
+        Returns:
+            tuple: List of black periods, and the duration of the input in seconds, if ffmpeg reported it.
+        """
+        FfmpegBlackSplit._check_blackdetect_simd()
+
+        black_periods: list[Period] = []
+        duration: Optional[float] = None
+
+        # parse the lines while ffmpeg runs instead of going through the whole log afterwards
+        def add_black_period(black_period: Period) -> None:
+            black_periods.append(black_period)
+            if on_black_period is not None:
+                on_black_period(black_period)
+
+        def parse_blackdetect_line(line: str) -> None:
+            nonlocal duration
+            if line.startswith("[blackdetect"):
+                add_black_period(FfmpegBlackSplit._parse_blackdetect_line(line))
+            elif duration is None and line.startswith("Duration:"):
+                duration = FfmpegBlackSplit._parse_duration_line(line)
+
+        try:
+            _run_ffmpeg(
+                self._blackdetect_cmd(video_filter, threads),
+                progress=self.progress,
+                stderr_callback=parse_blackdetect_line,
+            )
+        except RuntimeError:
+            # the hardware decoder may not be available on this machine or for this codec, so fall back to
+            # software decoding for this and all further runs, unless black periods were already passed on
+            if not self.hwaccel or black_periods:
+                raise
+            logger.warning(
+                "Could not detect black periods with hardware decoding ({}), retrying without it".format(
+                    self.hwaccel
+                )
+            )
+            self.hwaccel = None
+            _run_ffmpeg(
+                self._blackdetect_cmd(video_filter, threads),
+                progress=self.progress,
+                stderr_callback=parse_blackdetect_line,
+            )
+
+        return black_periods, duration
+
+    def _blackdetect_cmd(self, video_filter: str, threads: int = 0) -> list[str]:
+        """
+        Build the ffmpeg command that runs the blackdetect filter on the input.
+
+        Args:
+            video_filter (str): The filter graph to run, ending in the blackdetect filter.
+            threads (int, optional): Number of threads for ffmpeg to use. Defaults to 0 (let ffmpeg decide).
+
+        Returns:
+            list[str]: The command.
+        """
+        # decoded frames are downloaded to system memory automatically, where blackdetect runs
+        hwaccel_args = ["-hwaccel", self.hwaccel] if self.hwaccel else []
+        thread_args = ["-threads", str(threads)] if threads else []
+        skip_frame_args = ["-skip_frame", "nokey"] if self.keyframes_only else []
+
+        cmd = [
+            FFMPEG_BIN,
+            "-hide_banner",
+            *thread_args,
+            "-y",
+            *hwaccel_args,
+            *skip_frame_args,
+            *_probe_args(self.input_file),
+            "-i",
+            self.input_file,
+            # only the first video stream, so ffmpeg discards the packets of all other streams
+            "-map",
+            "0:v:0",
+            "-vf",
+            video_filter,
+            "-an",
+            "-sn",
+            "-dn",
+            "-f",
+            "null",
+            "-",
+        ]
+
+        return cmd
+
+    @staticmethod
+    def _check_blackdetect_simd():
+        """
+        Warn if ffmpeg is too old to have the much faster SIMD version of the blackdetect filter on x86 CPUs.
+
+        ffmpeg is only asked for its version once per process.
+        """
+        if FfmpegBlackSplit._blackdetect_simd_checked:
+            return
+        FfmpegBlackSplit._blackdetect_simd_checked = True
+
+        if platform.machine().lower() not in ("x86_64", "amd64"):
+            return
+
+        try:
+            output = subprocess.run(
+                [FFMPEG_BIN, "-hide_banner", "-version"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                universal_newlines=True,
+                **_POPEN_KWARGS,
+            ).stdout
+        except OSError:
+            # ffmpeg cannot be run at all, which the detection itself reports
+            return
+
+        version_match = _FFMPEG_VERSION_REGEX.search(output)
+        if version_match is None:
+            return
+
+        version = tuple(int(v) for v in version_match.groups())
+        if version < _BLACKDETECT_SIMD_VERSION:
+            logger.warning(
+                "ffmpeg {}.{} runs blackdetect without SIMD; ffmpeg {}.{} or later detects black periods "
+                "considerably faster".format(*version, *_BLACKDETECT_SIMD_VERSION)
+            )
+
+    def _run_blackdetect_ffprobe(
+        self,
+        video_filter: str,
+        black_min_duration: float,
+        on_black_period: Optional[Callable[[Period], None]] = None,
+    ) -> tuple[list[Period], Optional[float]]:
+        """
+        Run ffprobe on the blackdetect filter and read the black periods from the frame metadata.
+
+        Args:
+            video_filter (str): The filter graph to run, ending in the blackdetect filter.
+            black_min_duration (float): The minimum duration of the black periods to report.
+            on_black_period (Optional[Callable[[Period], None]], optional): Function called with each black period
+                                                                           as soon as ffprobe reports it.
+
+        Returns:
+            tuple: List of black periods, and the time of the last frame in seconds, if there were any frames.
+        """
+        if self.hwaccel:
+            logger.warning("Hardware decoding is not supported when detecting with ffprobe, ignoring it")
+        if self.keyframes_only:
+            logger.warning("Decoding only keyframes is not supported when detecting with ffprobe, ignoring it")
+
+        black_periods: list[Period] = []
+
+        # blackdetect sets the metadata for all black periods, not only the long enough ones
+        def add_black_period(start: float, end: float) -> None:
+            if end - start < black_min_duration:
+                return
+            black_period: Period = {
+                "start": start,
+                "end": end,
+                "duration": round(end - start, 6),
+            }
+            black_periods.append(black_period)
+            if on_black_period is not None:
+                on_black_period(black_period)
+
+        cmd = [
+            FFPROBE_BIN,
+            "-hide_banner",
+            "-v",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"movie={_escape_filter_value(self.input_file)},{video_filter}",
+            "-show_entries",
+            "frame=pts_time:frame_tags=lavfi.black_start,lavfi.black_end",
+            "-of",
+            "default=noprint_wrappers=1",
+        ]
+
+        cmd_q = " ".join([shlex.quote(c) for c in cmd])
+        logger.debug("Running ffprobe command: {}".format(cmd_q))
+
+        # each frame prints its time, and the frames where a black period starts or ends also
+        # the metadata, e.g. "pts_time=1.000000" and "TAG:lavfi.black_start=1"; the errors go to a file,
+        # as a pipe could fill up (e.g. with decoding errors) while only the output is read
+        with tempfile.TemporaryFile("w+", errors="replace") as stderr_file, subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            universal_newlines=True,
+            **_POPEN_KWARGS,
+        ) as proc:
+            assert proc.stdout is not None
+            black_start, last_frame_time = FfmpegBlackSplit._parse_ffprobe_frames(
+                proc.stdout, add_black_period
+            )
+            proc.wait()
+
+            if proc.returncode != 0:
+                stderr_file.seek(0)
+                stderr_tail = deque(
+                    (line.strip() for line in stderr_file), maxlen=_STDERR_TAIL_LINES
+                )
+                raise RuntimeError(
+                    "Error running command {}: {}".format(cmd_q, "\n".join(stderr_tail))
+                )
+
+        # a black period that lasts until the end of the input has no end in the metadata
+        if black_start is not None and last_frame_time is not None:
+            add_black_period(black_start, last_frame_time)
+
+        return black_periods, last_frame_time
+
+    def _cache_path(self, video_filter: str) -> str:
+        """
+        Get the path of the cache file for the black periods of the input file.
+
+        The file is keyed by the input path, size and modification time, and the detection options,
+        so that it is not used anymore once any of them changes.
+
+        Args:
+            video_filter (str): The blackdetect filter graph.
+
+        Returns:
+            str: Path to the cache file.
+        """
+        stat = os.stat(self.input_file)
+        key = "|".join(
+            [
+                os.path.abspath(self.input_file),
+                str(stat.st_size),
+                str(stat.st_mtime_ns),
+                video_filter,
+            ]
+        )
+        if self.keyframes_only:
+            key += "|keyframes"
+        # ffprobe reports the time of the last frame instead of the duration of the input
+        if self.use_ffprobe:
+            key += "|ffprobe"
+        cache_dir = os.path.join(
+            os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"),
+            "ffmpeg-black-split",
+        )
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(cache_dir, digest + ".json")
+
+    @staticmethod
+    def _read_cache(
+        cache_path: str,
+    ) -> Optional[tuple[list[Period], Optional[float]]]:
+        """
+        Read cached black periods.
+
+        Args:
+            cache_path (str): Path to the cache file.
+
+        Returns:
+            Optional[tuple]: The cached black periods and input duration, or None if there are none.
+        """
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            return cached["black_periods"], cached["duration"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable cache file {}: {}".format(cache_path, e))
+            return None
+
+    @staticmethod
+    def _write_cache(
+        cache_path: str, black_periods: list[Period], duration: Optional[float]
+    ):
+        """
+        Write black periods to the cache, atomically replacing any existing file.
+
+        Args:
+            cache_path (str): Path to the cache file.
+            black_periods (list[Period]): The black periods to cache.
+            duration (Optional[float]): The duration of the input in seconds.
+        """
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(cache_path), suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"black_periods": black_periods, "duration": duration}, f)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning("Could not write cache file {}: {}".format(cache_path, e))
+
+    @staticmethod
+    def _parse_blackdetect_line(line: str) -> Period:
+        """
+        Parse a black period from a blackdetect log line.
+
+        Args:
+            line (str): Log line, e.g. "[blackdetect @ 0x137f36f30] black_start:20 black_end:24.96 black_duration:4.96"
+
+        Returns:
+            Period: The black period.
+        """
+        # the values always come in this order, so splitting at the keys is enough
+        rest = line.partition("black_start:")[2]
+        black_start, _, rest = rest.partition(" black_end:")
+        black_end, _, black_duration = rest.partition(" black_duration:")
+
+        try:
+            return {
+                "start": float(black_start),
+                "end": float(black_end),
+                "duration": float(black_duration),
+            }
+        except ValueError:
+            raise Exception("Could not parse blackdetect line: {}".format(line))
+
+    @staticmethod
+    def _parse_duration_line(line: str) -> Optional[float]:
+        """
+        Parse the duration of the input from an ffmpeg log line.
+
+        Args:
+            line (str): Log line, e.g. "Duration: 00:00:30.00, start: 0.000000, bitrate: 30 kb/s"
+
+        Returns:
+            Optional[float]: The duration in seconds, or None if it is not known, e.g. "Duration: N/A".
+        """
+        duration_match = _DURATION_REGEX.match(line)
+        if duration_match is None:
+            return None
+        hours, minutes, seconds = duration_match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    @staticmethod
+    def _parse_ffprobe_frames(
+        lines: Iterable[str], add_black_period: Callable[[float, float], None]
+    ) -> tuple[Optional[float], Optional[float]]:
+        """
+        Parse the black periods from the frame metadata printed by ffprobe.
+
+        Args:
+            lines (Iterable[str]): Output lines, e.g. "pts_time=1.000000" or "TAG:lavfi.black_start=1"
+            add_black_period (Callable[[float, float], None]): Function called with the start and end of each
+                                                               black period.
+
+        Returns:
+            tuple: The start of a black period that has not ended, and the time of the last frame in seconds,
+                   each if there is one.
+        """
+        black_start: Optional[float] = None
+        last_frame_time: Optional[float] = None
+
+        for line in lines:
+            key, _, value = line.rstrip().partition("=")
+            if key == "pts_time":
+                if value != "N/A":
+                    last_frame_time = float(value)
+            elif key == "TAG:lavfi.black_start":
+                black_start = float(value)
+            elif key == "TAG:lavfi.black_end" and black_start is not None:
+                add_black_period(black_start, float(value))
+                black_start = None
+
+        return black_start, last_frame_time
+
+    def detect_and_cut_all_periods(
+        self,
+        output_directory: str,
+        black_min_duration=DEFAULT_BLACK_MIN_DURATION,
+        picture_black_ratio_th=DEFAULT_PICTURE_BLACK_RATIO_TH,
+        pixel_black_th=DEFAULT_PIXEL_BLACK_TH,
+        extension: str = "mkv",
+        no_copy: bool = False,
+        max_workers: Optional[int] = None,
+        threads: Optional[int] = None,
+        accurate_seek: bool = True,
+    ) -> list[Period]:
+        """
+        Detect black periods and cut the content periods to individual files while the detection is still running.
+
+        Each content period is cut as soon as the black period following it has been detected,
+        and the final, open-ended period once the detection has finished.
+
+        Args:
+            output_directory (str): Output directory.
+            black_min_duration (float, optional): Set the minimum detected black duration expressed in seconds.
+                                                  It must be a non-negative floating point number.
+            picture_black_ratio_th (float, optional): Set the threshold for considering a picture 'black'.
+            pixel_black_th (float, optional): Set the threshold for considering a pixel 'black'.
+            extension (str, optional): Output extension. Defaults to "mkv".
+            no_copy (bool, optional): Do not copy the streams, reencode them. Defaults to False.
+            max_workers (Optional[int], optional): Maximum number of parallel ffmpeg processes for cutting.
+                                                   Defaults to half the number of CPU cores.
+            threads (Optional[int], optional): Number of threads per ffmpeg process, for detecting and cutting.
+                                               Defaults to the number of CPU cores divided by the number of
+                                               parallel processes.
+            accurate_seek (bool, optional): When re-encoding, start exactly at the start time instead of the
+                                            keyframe before it. Defaults to True.
+
+        Returns:
+            list: List of black periods.
+        """
+        if max_workers is None:
+            max_workers = _default_max_workers()
+
+        if threads is None:
+            # the detection runs next to the cuts
+            threads = _ffmpeg_threads_per_invocation(max_workers + 1)
+
+        futures = []
+        previous_period_end = 0.0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            def cut(start: float, end: Union[float, None]) -> None:
+                futures.append(
+                    executor.submit(
+                        self.cut_part_from_file,
+                        self.input_file,
+                        output_directory=output_directory,
+                        start=start,
+                        end=end,
+                        extension=extension,
+                        no_copy=no_copy,
+                        threads=threads,
+                        accurate_seek=accurate_seek,
+                        prefix=self._output_prefix,
+                    )
+                )
+
+            def cut_content_before(black_period: Period) -> None:
+                nonlocal previous_period_end
+                if black_period["start"] > previous_period_end:
+                    cut(previous_period_end, black_period["start"])
+                previous_period_end = black_period["end"]
+
+            black_periods = self.detect_black_periods(
+                black_min_duration=black_min_duration,
+                picture_black_ratio_th=picture_black_ratio_th,
+                pixel_black_th=pixel_black_th,
+                on_black_period=cut_content_before,
+                threads=threads,
+            )
+
+            if len(black_periods) > 0 and not _ends_at(
+                previous_period_end, self.duration
+            ):
+                cut(previous_period_end, None)
+
+            for future in as_completed(futures):
+                future.result()
+
+        return black_periods
+
     @staticmethod
     def black_periods_to_content_periods(
         black_periods: list[Period],
+        duration: Optional[float] = None,
     ) -> list[Union[Period, OpenPeriod]]:
         """
         Calculate the inverted black periods to get the content periods.
 
         Args:
             black_periods (list): List of black periods.
+            duration (Optional[float], optional): Duration of the input in seconds. If given, no final,
+                                                  open-ended content period is added when the last black
+                                                  period lasts until the end of the input.
 
         Returns:
             list: List of content periods.
@@ -172,40 +964,40 @@ class FfmpegBlackSplit:
         content_periods: list[Union[Period, OpenPeriod]] = []
         previous_period_end: float = 0.0
 
-        sorted_black_periods = sorted(black_periods, key=lambda x: x["start"])
+        # look up the times once, not on every comparison
+        black_times = [
+            (black_period["start"], black_period["end"])
+            for black_period in sorted(black_periods, key=itemgetter("start"))
+        ]
 
-        for black_period in sorted_black_periods:
-            if black_period["start"] > previous_period_end:
+        for black_start, black_end in black_times:
+            if black_start > previous_period_end:
                 content_periods.append(
-                    {"start": previous_period_end, "end": black_period["start"]}
+                    {"start": previous_period_end, "end": black_start}
                 )
-            previous_period_end = black_period["end"]
+            previous_period_end = black_end
 
-        # add a final, open-ended one
-        content_periods.append({"start": previous_period_end, "end": None})
+        # add a final, open-ended one, unless there is no content left
+        if not _ends_at(previous_period_end, duration):
+            content_periods.append({"start": previous_period_end, "end": None})
 
         return content_periods
 
-    def cut_all_periods(
-        self,
-        output_directory: str,
-        extension: str = "mkv",
-        no_copy: bool = False,
-        progress: bool = False,
-        filtered_black_periods: Optional[list[Period]] = None,
-    ):
+    def _get_cuts(
+        self, filtered_black_periods: Optional[list[Period]] = None
+    ) -> list[tuple[float, Union[float, None]]]:
         """
-        Cut all periods to individual files.
+        Get the start and end times of the content periods to cut.
 
         Args:
-            output_directory (str): Output directory.
-            no_copy (bool, optional): Do not copy the streams, reencode them. Defaults to False.
-            progress (bool, optional): Show progress bar. Defaults to False.
             filtered_black_periods (Optional[list[Period]]): List of filtered black periods to use for cutting
+
+        Returns:
+            list: List of (start, end) tuples, where end is None for the final, open-ended period.
         """
         if filtered_black_periods is not None:
             content_periods = self.black_periods_to_content_periods(
-                filtered_black_periods
+                filtered_black_periods, duration=self.duration
             )
         else:
             content_periods = self.content_periods
@@ -213,6 +1005,7 @@ class FfmpegBlackSplit:
         if len(content_periods) == 0:
             raise Exception("No content periods detected.")
 
+        cuts: list[tuple[float, Union[float, None]]] = []
         for i, content_period in enumerate(content_periods):
             start = content_period["start"]
             end = content_period.get("end")
@@ -220,15 +1013,318 @@ class FfmpegBlackSplit:
             if end is None and i < len(content_periods) - 1:
                 end = content_periods[i + 1]["start"]
 
-            self.cut_part_from_file(
-                self.input_file,
-                output_directory=output_directory,
-                start=start,
-                end=end,
+            cuts.append((start, end))
+
+        return cuts
+
+    def cut_all_periods(
+        self,
+        output_directory: str,
+        extension: str = "mkv",
+        no_copy: bool = False,
+        progress: bool = False,
+        filtered_black_periods: Optional[list[Period]] = None,
+        max_workers: Optional[int] = None,
+        threads: Optional[int] = None,
+        accurate_seek: bool = True,
+    ):
+        """
+        Cut all periods to individual files.
+
+        The cuts are independent of each other, so they are run in parallel, each in its own ffmpeg process.
+        With many periods, starting all these processes gets costly, so when re-encoding without parallel
+        processes, all periods are written as separate outputs of a single ffmpeg process instead.
+        That process decodes the whole input and always cuts exactly at the start times, so `accurate_seek`
+        has no effect there.
+
+        Args:
+            output_directory (str): Output directory.
+            no_copy (bool, optional): Do not copy the streams, reencode them. Defaults to False.
+            progress (bool, optional): Show progress bar. Defaults to False.
+            filtered_black_periods (Optional[list[Period]]): List of filtered black periods to use for cutting
+            max_workers (Optional[int], optional): Maximum number of parallel ffmpeg processes.
+                                                   Defaults to half the number of CPU cores.
+            threads (Optional[int], optional): Number of threads per ffmpeg process. Defaults to the number of
+                                               CPU cores divided by the number of parallel processes.
+            accurate_seek (bool, optional): When re-encoding in separate processes, start exactly at the start
+                                            time instead of the keyframe before it. Defaults to True.
+        """
+        cuts = self._get_cuts(filtered_black_periods)
+
+        if max_workers is None:
+            max_workers = min(len(cuts), _default_max_workers())
+
+        if no_copy and max_workers <= 1 and len(cuts) >= _SINGLE_PROCESS_MIN_CUTS:
+            self._cut_all_periods_single_process(
+                cuts,
+                output_directory,
                 extension=extension,
-                no_copy=no_copy,
                 progress=progress,
+                threads=threads or 0,
             )
+            return
+
+        if max_workers <= 1:
+            for start, end in cuts:
+                self.cut_part_from_file(
+                    self.input_file,
+                    output_directory=output_directory,
+                    start=start,
+                    end=end,
+                    extension=extension,
+                    no_copy=no_copy,
+                    progress=progress,
+                    threads=threads or 0,
+                    accurate_seek=accurate_seek,
+                    prefix=self._output_prefix,
+                )
+            return
+
+        if threads is None:
+            threads = _ffmpeg_threads_per_invocation(max_workers)
+
+        # the actual work happens in ffmpeg subprocesses, so threads are enough here;
+        # per-cut progress bars would interleave, so we only count finished cuts
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    self.cut_part_from_file,
+                    self.input_file,
+                    output_directory=output_directory,
+                    start=start,
+                    end=end,
+                    extension=extension,
+                    no_copy=no_copy,
+                    progress=False,
+                    threads=threads,
+                    accurate_seek=accurate_seek,
+                    prefix=self._output_prefix,
+                )
+                for start, end in cuts
+            ]
+            with tqdm(total=len(futures), position=1, disable=not progress) as pbar:
+                for future in as_completed(futures):
+                    future.result()
+                    pbar.update(1)
+
+    def _cut_all_periods_single_process(
+        self,
+        cuts: list[tuple[float, Union[float, None]]],
+        output_directory: str,
+        extension: str = "mkv",
+        progress: bool = False,
+        threads: int = 0,
+    ):
+        """
+        Re-encode all periods with a single ffmpeg process, which decodes the input once and writes
+        each period as a separate output.
+
+        Args:
+            cuts (list): List of (start, end) tuples, where end is None for the final, open-ended period.
+            output_directory (str): Output directory.
+            extension (str, optional): Output extension. Defaults to "mkv".
+            progress (bool, optional): Show progress bar. Defaults to False.
+            threads (int, optional): Number of threads for ffmpeg to use. Defaults to 0 (let ffmpeg decide).
+        """
+        thread_args = ["-threads", str(threads)] if threads else []
+
+        output_args: list[str] = []
+        for start, end in cuts:
+            output_args.extend(
+                [
+                    "-ss",
+                    str(start),
+                    *(["-to", str(end)] if end is not None else []),
+                    *_codec_args(no_copy=True),
+                    *thread_args,
+                    *_map_args(extension),
+                    _output_file(
+                        output_directory, self._output_prefix, start, end, extension
+                    ),
+                ]
+            )
+
+        cmd = [
+            FFMPEG_BIN,
+            "-hide_banner",
+            *thread_args,
+            "-y",
+            "-i",
+            self.input_file,
+            *output_args,
+        ]
+
+        _run_ffmpeg(cmd, progress=progress)
+
+    def cut_all_periods_segmented(
+        self,
+        output_directory: str,
+        extension: str = "mkv",
+        progress: bool = False,
+        filtered_black_periods: Optional[list[Period]] = None,
+    ):
+        """
+        Cut all periods to individual files in a single ffmpeg pass, using the segment muxer.
+
+        The input is only opened and read once, instead of once per period. This only
+        works with stream copy; use `cut_all_periods` with `no_copy=True` for re-encoding.
+
+        The segment muxer can only split the input at keyframes, so each file starts at the keyframe
+        at or before the start of its period, and ends at the keyframe at or after its end. Periods
+        spanning several segments are joined from them with the concat demuxer.
+
+        Args:
+            output_directory (str): Output directory.
+            extension (str, optional): Output extension. Defaults to "mkv".
+            progress (bool, optional): Show progress bar. Defaults to False.
+            filtered_black_periods (Optional[list[Period]]): List of filtered black periods to use for cutting
+        """
+        cuts = self._get_cuts(filtered_black_periods)
+
+        # split at every content period boundary; the segments in between are black and discarded
+        segment_times = sorted(
+            {t for cut in cuts for t in cut if t is not None and t > 0}
+        )
+
+        tmp_dir = tempfile.mkdtemp(prefix=".ffmpeg-black-split-", dir=output_directory)
+
+        segment_list = os.path.join(tmp_dir, "segments.csv")
+
+        try:
+            cmd = [
+                FFMPEG_BIN,
+                "-hide_banner",
+                "-y",
+                "-i",
+                self.input_file,
+                *_codec_args(no_copy=False),
+                *_map_args(extension),
+                # keep the timestamps (and the times in the segment list) as in the input, instead of
+                # shifting them by the decoder delay of B-frames
+                "-avoid_negative_ts",
+                "disabled",
+                "-f",
+                "segment",
+                "-segment_times",
+                ",".join(str(t) for t in segment_times),
+                "-reset_timestamps",
+                "1",
+                "-segment_list",
+                segment_list,
+                "-segment_list_type",
+                "csv",
+                os.path.join(tmp_dir, f"%05d.{extension}"),
+            ]
+
+            _run_ffmpeg(cmd, progress=progress)
+
+            # the segments can only start at keyframes, so they do not necessarily line up with
+            # the periods; read their actual times, e.g. "00001.mkv,10.000000,15.000000"
+            segments: list[tuple[str, float, float]] = []
+            with open(segment_list) as f:
+                for line in f:
+                    segment_file, segment_start, segment_end = line.rstrip().rsplit(",", 2)
+                    segments.append(
+                        (segment_file, float(segment_start), float(segment_end))
+                    )
+
+            # each period needs all segments that overlap it; without a keyframe in between,
+            # several periods share a segment, and with keyframes far apart, a period spans several
+            period_segments = [
+                [
+                    segment_file
+                    for segment_file, segment_start, segment_end in segments
+                    if (end is None or segment_start < end - _SEGMENT_TIME_TOLERANCE)
+                    and segment_end > start + _SEGMENT_TIME_TOLERANCE
+                ]
+                for start, end in cuts
+            ]
+            last_use = {
+                segment_file: n
+                for n, segment_files in enumerate(period_segments)
+                for segment_file in segment_files
+            }
+
+            for n, ((start, end), segment_files) in enumerate(
+                zip(cuts, period_segments)
+            ):
+                output_file = _output_file(
+                    output_directory, self._output_prefix, start, end, extension
+                )
+                if len(segment_files) > 1:
+                    self._concat_segments(tmp_dir, segment_files, output_file, n)
+                elif last_use[segment_files[0]] != n:
+                    shutil.copyfile(os.path.join(tmp_dir, segment_files[0]), output_file)
+                else:
+                    os.replace(os.path.join(tmp_dir, segment_files[0]), output_file)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _concat_segments(
+        tmp_dir: str, segment_files: list[str], output_file: str, n: int
+    ):
+        """
+        Join segments written by the segment muxer into one file, using the concat demuxer.
+
+        Args:
+            tmp_dir (str): Directory containing the segments.
+            segment_files (list[str]): File names of the segments, in order.
+            output_file (str): Path of the file to write.
+            n (int): Number of the period, to name the list file.
+        """
+        # relative paths are resolved against the list file, which is next to the segments
+        list_file = os.path.join(tmp_dir, f"{n:05d}.ffconcat")
+        with open(list_file, "w") as f:
+            f.write("ffconcat version 1.0\n")
+            for segment_file in segment_files:
+                f.write(f"file '{segment_file}'\n")
+
+        cmd = [
+            FFMPEG_BIN,
+            "-hide_banner",
+            "-y",
+            "-f",
+            "concat",
+            "-i",
+            list_file,
+            "-map",
+            "0",
+            *_codec_args(no_copy=False),
+            output_file,
+        ]
+
+        _run_ffmpeg(cmd)
+
+    def export_edl(
+        self,
+        output_path: str,
+        filtered_black_periods: Optional[list[Period]] = None,
+    ):
+        """
+        Write an ffconcat edit list that references the content periods in the input file, instead of cutting them.
+
+        The list can be read with ffmpeg's concat demuxer, e.g. `ffplay -f concat -safe 0 -i <output_path>`,
+        to play or process the content periods without writing any files first.
+
+        Args:
+            output_path (str): Path of the edit list file to write.
+            filtered_black_periods (Optional[list[Period]]): List of filtered black periods to use for cutting
+        """
+        cuts = self._get_cuts(filtered_black_periods)
+
+        # the concat demuxer resolves relative paths against the list file, so use an absolute one
+        input_file = os.path.abspath(self.input_file).replace("'", "'\\''")
+
+        lines = ["ffconcat version 1.0"]
+        for start, end in cuts:
+            lines.append(f"file '{input_file}'")
+            lines.append(f"inpoint {start}")
+            if end is not None:
+                lines.append(f"outpoint {end}")
+
+        with open(output_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
 
     @staticmethod
     def filter_black_periods(
@@ -257,14 +1353,37 @@ class FfmpegBlackSplit:
             video_duration * (i + 1) / (num_cuts + 1) for i in range(num_cuts)
         ]
 
-        selected_periods = []
+        # keep the remaining periods sorted by their midpoint, so that the closest one
+        # to each cut time is found by bisection instead of comparing against all of them
+        remaining = sorted(
+            (period["start"] + period["duration"] / 2, i)
+            for i, period in enumerate(black_periods)
+        )
+        remaining_midpoints = [midpoint for midpoint, _ in remaining]
+
+        selected_indices = []
         for cut_time in ideal_cut_times:
-            closest_period = min(
-                black_periods,
-                key=lambda p: abs(p["start"] + p["duration"] / 2 - cut_time),
+            pos = bisect_left(remaining_midpoints, cut_time)
+            # the closest period is right before or at the insertion point; on a tie, prefer the earlier one,
+            # so of several periods with the same midpoint before the cut time, take the first, not the last
+            candidates = [pos] if pos < len(remaining) else []
+            if pos > 0:
+                candidates.append(
+                    bisect_left(remaining_midpoints, remaining_midpoints[pos - 1])
+                )
+            closest_pos = min(
+                candidates,
+                key=lambda p: (abs(remaining_midpoints[p] - cut_time), remaining[p][1]),
             )
-            selected_periods.append(closest_period)
-            black_periods.remove(closest_period)
+            selected_indices.append(remaining[closest_pos][1])
+            del remaining[closest_pos]
+            del remaining_midpoints[closest_pos]
+
+        selected_periods = [black_periods[i] for i in selected_indices]
+
+        # the selected periods are removed from the passed list
+        for i in sorted(selected_indices, reverse=True):
+            del black_periods[i]
 
         return selected_periods
 
@@ -277,10 +1396,17 @@ class FfmpegBlackSplit:
         extension: str = "mkv",
         no_copy: bool = False,
         progress: bool = False,
+        threads: int = 0,
+        accurate_seek: bool = True,
+        prefix: Optional[str] = None,
     ):
         """
         Cut a part of a video.
 
+        The input is always seeked to the start time, and read up to the end time. When stream-copying, the cut
+        then begins at the keyframe at or before the start time. When re-encoding, the frames between
+        that keyframe and the start time are decoded and dropped, unless `accurate_seek` is disabled.
+
         Args:
             input_file (str): Input file.
             output_directory (str): Output directory.
@@ -289,60 +1415,54 @@ class FfmpegBlackSplit:
             extension (str, optional): Output extension. Defaults to "mkv".
             no_copy (bool, optional): Do not copy the streams, reencode them. Defaults to False.
             progress (bool, optional): Show progress bar. Defaults to False.
+            threads (int, optional): Number of threads for ffmpeg to use. Defaults to 0 (let ffmpeg decide).
+            accurate_seek (bool, optional): When re-encoding, start exactly at the start time instead of the
+                                            keyframe before it. Defaults to True.
+            prefix (Optional[str], optional): Prefix of the output file name. Defaults to the input file name
+                                              without extension.
         """
         if start is None:
             start = 0
 
+        if prefix is None:
+            prefix = _output_prefix(input_file)
+
+        # as input options, both times refer to the input timestamps, and ffmpeg
+        # stops reading the input at the end time
         if end is not None and end != "":
-            to_args = ["-t", str(end - start)]
+            to_args = ["-to", str(end)]
         else:
             end = ""
             to_args = []
 
-        if no_copy:
-            # TODO: allow setting codec
-            codec_args = ["-c:v", "libx264", "-c:a", "aac"]
+        if accurate_seek or not no_copy:
+            input_args = to_args
+            output_args: list[str] = []
         else:
-            codec_args = ["-c", "copy"]
-
-        suffix = f"{start}-{end}.{extension}"
-        prefix = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = os.path.join(output_directory, f"{prefix}_{suffix}")
+            # the frames before the start time would get negative timestamps and be dropped, and the end time
+            # would count from the keyframe before it, so keep the input timestamps, stop at the end time in
+            # the output, and only then shift the timestamps to zero
+            input_args = ["-noaccurate_seek", "-copyts"]
+            output_args = [*to_args, "-avoid_negative_ts", "make_zero"]
 
-        # see https://github.com/slhck/ffmpeg-black-split/issues/3
-        ignore_data_args = (
-            [
-                "-map",
-                "-0:d",  # ignore data streams
-            ]
-            if extension == "mkv"
-            else []
-        )
+        # applies to the decoder, and to the encoder when re-encoding
+        thread_args = ["-threads", str(threads)] if threads else []
 
         cmd = [
-            "ffmpeg",
+            FFMPEG_BIN,
             "-hide_banner",
+            *thread_args,
             "-y",
             "-ss",
             str(start),
+            *input_args,
             "-i",
             input_file,
-            *to_args,
-            *codec_args,
-            "-map",
-            "0",
-            *ignore_data_args,
-            output_file,
+            *output_args,
+            *_codec_args(no_copy),
+            *(thread_args if no_copy else []),
+            *_map_args(extension),
+            _output_file(output_directory, prefix, start, end, extension),
         ]
 
-        cmd_q = " ".join([shlex.quote(c) for c in cmd])
-        logger.debug("Running ffmpeg command: {}".format(cmd_q))
-
-        ff = FfmpegProgress(cmd)
-        if progress:
-            with tqdm(total=100, position=1) as pbar:
-                for p in ff.run_command_with_progress():
-                    pbar.update(p - pbar.n)
-        else:
-            for _ in ff.run_command_with_progress():
-                pass
+        _run_ffmpeg(cmd, progress=progress)
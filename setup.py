@@ -38,7 +38,8 @@ setup(
         "Programming Language :: Python :: 3.11",
     ],
     python_requires=">=3.8",
-    install_requires=["tqdm>=4.38.0", "ffmpeg-progress-yield"],
+    install_requires=["tqdm>=4.38.0", "ffmpeg-progress-yield>=0.5.0"],
+    extras_require={"orjson": ["orjson"]},
     packages=["ffmpeg_black_split"],
     entry_points={
         "console_scripts": [
@@ -12,13 +12,16 @@ TEST_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), "test.mp4"))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from ffmpeg_black_split import FfmpegBlackSplit as ffbs
+from ffmpeg_black_split import _black_split
 
 
-def run_command(cmd):
+def run_command(cmd, env=None):
     """
     Run a command directly
     """
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env
+    )
     stdout, stderr = process.communicate()
 
     if process.returncode == 0:
@@ -31,7 +34,62 @@ def run_command(cmd):
         )
 
 
+def get_duration(file_path):
+    """
+    Get the duration of a file via ffprobe
+    """
+    stdout, _ = run_command(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            file_path,
+        ]
+    )
+    return float(stdout)
+
+
 @pytest.fixture(scope="session")
+def sparse_keyframes_file(tmp_path_factory):
+    """
+    A 30 second video with keyframes every 5 seconds, and black periods
+    at 2-3, 6-7, 12-13 and 22-23 seconds, i.e. not at the keyframes
+    """
+    file_path = str(tmp_path_factory.mktemp("input") / "sparse.mp4")
+    black = "+".join(
+        f"gte(t,{start})*lt(t,{start + 1})" for start in (2, 6, 12, 22)
+    )
+    run_command(
+        [
+            "ffmpeg",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            "color=white:s=320x180:r=25:d=30",
+            "-vf",
+            f"drawbox=x=0:y=0:w=iw:h=ih:color=black:t=fill:enable='{black}'",
+            "-c:v",
+            "libx264",
+            "-g",
+            "125",
+            "-keyint_min",
+            "125",
+            "-sc_threshold",
+            "0",
+            "-pix_fmt",
+            "yuv420p",
+            file_path,
+        ]
+    )
+    return file_path
+
+
+@pytest.fixture
 def clear_files_teardown():
     yield None
     for f in os.listdir(os.path.dirname(TEST_FILE)):
@@ -40,7 +98,7 @@ def clear_files_teardown():
 
 
 class TestBlackSplit:
-    def test_output(self, clear_files_teardown):
+    def test_output(self, clear_files_teardown, tmp_path):
         """
         Test JSON output
         """
@@ -54,7 +112,9 @@ class TestBlackSplit:
                 "-o",
                 os.path.dirname(__file__),
                 "--no-copy",
-            ]
+            ],
+            # don't answer from the cache of earlier runs
+            env={**os.environ, "XDG_CACHE_HOME": str(tmp_path)},
         )
 
         assert json.loads(stdout) == {
@@ -80,22 +140,28 @@ class TestBlackSplit:
             output_file_path = os.path.join(os.path.dirname(__file__), output_file)
             assert os.path.exists(output_file_path)
 
-            # get the duration of the output via ffmpeg
-            cmd = [
-                "ffprobe",
-                "-v",
-                "error",
-                "-show_entries",
-                "format=duration",
-                "-of",
-                "default=noprint_wrappers=1:nokey=1",
-                output_file_path,
-            ]
-            stdout, _ = run_command(cmd)
-            assert float(stdout) == 5.0
+            assert get_duration(output_file_path) == 5.0
 
             os.remove(output_file_path)
 
+    def test_output_cached(self, tmp_path):
+        """
+        Test that a second run reuses the cached black periods
+        """
+        cmd = ["python3", "-m", "ffmpeg_black_split", TEST_FILE, "-v", "--no-split"]
+        env = {**os.environ, "XDG_CACHE_HOME": str(tmp_path)}
+
+        stdout, stderr = run_command(cmd, env=env)
+        assert "Using cached black periods" not in stderr
+
+        cached_stdout, cached_stderr = run_command(cmd, env=env)
+        assert "Using cached black periods" in cached_stderr
+        assert json.loads(cached_stdout) == json.loads(stdout)
+
+        # the cache can be bypassed
+        _, stderr = run_command(cmd + ["--no-cache"], env=env)
+        assert "Using cached black periods" not in stderr
+
     def test_filter_black_periods(self):
         """
         Test the filter_black_periods method
@@ -125,6 +191,69 @@ class TestBlackSplit:
         with pytest.raises(ValueError):
             fbs.filter_black_periods(black_periods, num_cuts=1)
 
+    def test_filter_black_periods_same_midpoint(self):
+        """
+        Test that of several black periods with the same midpoint, the first one is selected
+        """
+        black_periods = [
+            {"start": 9.0, "end": 11.0, "duration": 2.0},
+            {"start": 9.5, "end": 10.5, "duration": 1.0},
+            {"start": 28.0, "end": 30.0, "duration": 2.0},
+        ]
+
+        # the ideal cut time is at 15, after the shared midpoint at 10
+        filtered_periods = ffbs.filter_black_periods(black_periods, num_cuts=1)
+        assert filtered_periods == [{"start": 9.0, "end": 11.0, "duration": 2.0}]
+
+    def test_parse_blackdetect_line(self):
+        """
+        Test parsing blackdetect log lines
+        """
+        assert ffbs._parse_blackdetect_line(
+            "[blackdetect @ 0x137f36f30] black_start:20 black_end:24.96 black_duration:4.96"
+        ) == {"start": 20.0, "end": 24.96, "duration": 4.96}
+
+        assert ffbs._parse_blackdetect_line(
+            "[blackdetect @ 0x137f36f30] black_start:0.5 black_end:3 black_duration:2.5"
+        ) == {"start": 0.5, "end": 3.0, "duration": 2.5}
+
+        with pytest.raises(Exception):
+            ffbs._parse_blackdetect_line("[blackdetect @ 0x137f36f30] black_start:20")
+
+    def test_parse_duration_line(self):
+        """
+        Test parsing the duration from ffmpeg log lines
+        """
+        assert (
+            ffbs._parse_duration_line(
+                "Duration: 01:02:03.50, start: 0.000000, bitrate: 30 kb/s"
+            )
+            == 3723.5
+        )
+        assert ffbs._parse_duration_line("Duration: N/A, bitrate: N/A") is None
+
+    def test_parse_ffprobe_frames(self):
+        """
+        Test parsing the frame metadata printed by ffprobe
+        """
+        black_periods = []
+        lines = [
+            "pts_time=0.000000\n",
+            "TAG:lavfi.black_start=0\n",
+            "pts_time=0.040000\n",
+            "pts_time=2.000000\n",
+            "TAG:lavfi.black_end=2\n",
+            "pts_time=N/A\n",
+            "pts_time=3.000000\n",
+            "TAG:lavfi.black_start=3\n",
+            "pts_time=3.040000\n",
+        ]
+
+        assert ffbs._parse_ffprobe_frames(
+            lines, lambda start, end: black_periods.append((start, end))
+        ) == (3.0, 3.04)
+        assert black_periods == [(0.0, 2.0)]
+
     def test_cut_all_periods_with_filtered_periods(self, clear_files_teardown):
         """
         Test cut_all_periods method with filtered black periods
@@ -153,3 +282,303 @@ class TestBlackSplit:
         # Clean up
         for f in expected_files:
             os.remove(os.path.join(os.path.dirname(__file__), f))
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    @pytest.mark.parametrize("no_copy", [True, False])
+    def test_cut_all_periods(self, clear_files_teardown, max_workers, no_copy):
+        """
+        Test cutting the periods one after another and with several ffmpeg processes in parallel
+        """
+        fbs = ffbs(TEST_FILE)
+        fbs.detect_black_periods()
+        fbs.cut_all_periods(
+            os.path.dirname(__file__), no_copy=no_copy, max_workers=max_workers
+        )
+
+        for output_file in [
+            "test_5.0-10.0.mkv",
+            "test_15.0-20.0.mkv",
+            "test_25.0-.mkv",
+        ]:
+            output_file_path = os.path.join(os.path.dirname(__file__), output_file)
+            # stream copies may keep a few more frames before the start
+            assert get_duration(output_file_path) == pytest.approx(
+                5.0, abs=0 if no_copy else 0.25
+            )
+
+    def test_cut_all_periods_single_process(self, sparse_keyframes_file, tmp_path):
+        """
+        Test re-encoding many periods with a single ffmpeg process, and that
+        stream-copying them does not lose content between keyframes
+        """
+        fbs = ffbs(sparse_keyframes_file)
+        fbs.detect_black_periods(black_min_duration=1.0)
+        assert len(fbs.content_periods) >= 4
+
+        expected_durations = {
+            "sparse_0.0-2.0.mkv": 2.0,
+            "sparse_3.0-6.0.mkv": 3.0,
+            "sparse_7.0-12.0.mkv": 5.0,
+            "sparse_13.0-22.0.mkv": 9.0,
+            "sparse_23.0-.mkv": 7.0,
+        }
+
+        (tmp_path / "reencoded").mkdir()
+        fbs.cut_all_periods(str(tmp_path / "reencoded"), no_copy=True, max_workers=1)
+        for output_file, duration in expected_durations.items():
+            assert get_duration(
+                str(tmp_path / "reencoded" / output_file)
+            ) == pytest.approx(duration, abs=0.05)
+
+        # stream copy starts at the keyframe before each period, and must still contain all of it
+        (tmp_path / "copied").mkdir()
+        fbs.cut_all_periods(str(tmp_path / "copied"), max_workers=1)
+        for output_file, duration in expected_durations.items():
+            assert get_duration(str(tmp_path / "copied" / output_file)) >= duration
+
+    def test_cut_all_periods_segmented(self, clear_files_teardown):
+        """
+        Test cutting all periods in a single pass with the segment muxer
+        """
+        fbs = ffbs(TEST_FILE)
+        fbs.detect_black_periods()
+        fbs.cut_all_periods_segmented(os.path.dirname(__file__))
+
+        expected_files = [
+            "test_5.0-10.0.mkv",
+            "test_15.0-20.0.mkv",
+            "test_25.0-.mkv",
+        ]
+
+        # test.mp4 has keyframes at the period boundaries
+        for output_file in expected_files:
+            output_file_path = os.path.join(os.path.dirname(__file__), output_file)
+            assert get_duration(output_file_path) == 5.0
+
+        # no leftover segments of the black periods
+        assert sorted(
+            f for f in os.listdir(os.path.dirname(__file__)) if f.endswith(".mkv")
+        ) == sorted(expected_files)
+
+        # Clean up
+        for f in expected_files:
+            os.remove(os.path.join(os.path.dirname(__file__), f))
+
+    def test_cut_all_periods_segmented_sparse_keyframes(
+        self, sparse_keyframes_file, tmp_path
+    ):
+        """
+        Test that the single pass cut extends periods to the surrounding keyframes
+        when they do not line up with the periods
+        """
+        fbs = ffbs(sparse_keyframes_file)
+        fbs.detect_black_periods(black_min_duration=1.0)
+        fbs.cut_all_periods_segmented(str(tmp_path))
+
+        # keyframes are at every 5 seconds, e.g. 3-6 spans 0-10 and 13-22 spans 10-25
+        expected_durations = {
+            "sparse_0.0-2.0.mkv": 5.0,
+            "sparse_3.0-6.0.mkv": 10.0,
+            "sparse_7.0-12.0.mkv": 10.0,
+            "sparse_13.0-22.0.mkv": 15.0,
+            "sparse_23.0-.mkv": 10.0,
+        }
+
+        assert sorted(os.listdir(tmp_path)) == sorted(expected_durations)
+        for output_file, duration in expected_durations.items():
+            assert get_duration(str(tmp_path / output_file)) == pytest.approx(
+                duration, abs=0.1
+            )
+
+    def test_detect_and_cut_all_periods(self, clear_files_teardown):
+        """
+        Test cutting the content periods while the detection is running
+        """
+        fbs = ffbs(TEST_FILE)
+        black_periods = fbs.detect_and_cut_all_periods(
+            os.path.dirname(__file__), no_copy=True
+        )
+        assert len(black_periods) == 3
+
+        expected_files = [
+            "test_5.0-10.0.mkv",
+            "test_15.0-20.0.mkv",
+            "test_25.0-.mkv",
+        ]
+
+        for output_file in expected_files:
+            assert os.path.exists(os.path.join(os.path.dirname(__file__), output_file))
+
+        # Clean up
+        for f in expected_files:
+            os.remove(os.path.join(os.path.dirname(__file__), f))
+
+    def test_detect_black_periods_cache(self, tmp_path, monkeypatch):
+        """
+        Test that detected black periods are cached and reused
+        """
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        black_periods = ffbs(TEST_FILE, use_cache=True).detect_black_periods()
+        cache_files = os.listdir(tmp_path / "ffmpeg-black-split")
+        assert len(cache_files) == 1
+
+        assert ffbs(TEST_FILE, use_cache=True).detect_black_periods() == black_periods
+
+        # different options must not use the same cache entry
+        ffbs(TEST_FILE, use_cache=True).detect_black_periods(black_min_duration=1.0)
+        assert len(os.listdir(tmp_path / "ffmpeg-black-split")) == 2
+
+        # nor must the detection via ffprobe
+        ffbs(TEST_FILE, use_cache=True, use_ffprobe=True).detect_black_periods()
+        assert len(os.listdir(tmp_path / "ffmpeg-black-split")) == 3
+
+    def test_detect_black_periods_ffprobe(self):
+        """
+        Test that the detection via ffprobe finds the same black periods as via ffmpeg
+        """
+        black_periods = ffbs(TEST_FILE).detect_black_periods()
+        assert ffbs(TEST_FILE, use_ffprobe=True).detect_black_periods() == black_periods
+
+    def test_detect_black_periods_hwaccel_fallback(self):
+        """
+        Test that the detection falls back to software decoding if hardware decoding fails
+        """
+        fbs = ffbs(TEST_FILE, hwaccel="nonexistent")
+        assert fbs.detect_black_periods() == [
+            {"start": 0.0, "end": 5.0, "duration": 5.0},
+            {"start": 10.0, "end": 15.0, "duration": 5.0},
+            {"start": 20.0, "end": 25.0, "duration": 5.0},
+        ]
+        assert fbs.hwaccel is None
+
+    def test_detect_black_periods_hwaccel_no_retry(self, monkeypatch):
+        """
+        Test that the detection is not retried once black periods were passed on
+        """
+
+        def run_ffmpeg(cmd, progress=False, stderr_callback=None):
+            stderr_callback(
+                "[blackdetect @ 0x0] black_start:0 black_end:5 black_duration:5"
+            )
+            raise RuntimeError("decoding failed")
+
+        monkeypatch.setattr(_black_split, "_run_ffmpeg", run_ffmpeg)
+
+        black_periods = []
+        fbs = ffbs(TEST_FILE, hwaccel="nonexistent")
+        with pytest.raises(RuntimeError):
+            fbs.detect_black_periods(on_black_period=black_periods.append)
+        assert black_periods == [{"start": 0.0, "end": 5.0, "duration": 5.0}]
+        assert fbs.hwaccel == "nonexistent"
+
+    @pytest.mark.parametrize(
+        "version_output, expected_warning",
+        [
+            ("ffmpeg version 4.4.2-0ubuntu0.22.04.1 Copyright (c) 2000-2021", "ffmpeg 4.4 "),
+            ("ffmpeg version n6.0 Copyright (c) 2000-2023", "ffmpeg 6.0 "),
+            ("ffmpeg version 7.1.1-static https://johnvansickle.com/ffmpeg/", "ffmpeg 7.1 "),
+            ("ffmpeg version 8.0 Copyright (c) 2000-2025", None),
+            ("ffmpeg version n10.1-3-g0123456789 Copyright (c) 2000-2027", None),
+            # git builds have no version number to compare
+            ("ffmpeg version N-112345-g0123456789 Copyright (c) 2000-2025", None),
+        ],
+    )
+    def test_check_blackdetect_simd(
+        self, monkeypatch, caplog, version_output, expected_warning
+    ):
+        """
+        Test that a warning is logged for ffmpeg versions without the SIMD blackdetect filter
+        """
+        calls = []
+
+        def run(cmd, **kwargs):
+            calls.append(cmd)
+            return subprocess.CompletedProcess(cmd, 0, stdout=version_output)
+
+        monkeypatch.setattr(_black_split.subprocess, "run", run)
+        monkeypatch.setattr(_black_split.platform, "machine", lambda: "x86_64")
+        monkeypatch.setattr(ffbs, "_blackdetect_simd_checked", False)
+
+        ffbs._check_blackdetect_simd()
+        if expected_warning is None:
+            assert "without SIMD" not in caplog.text
+        else:
+            assert expected_warning + "runs blackdetect without SIMD" in caplog.text
+
+        # ffmpeg is only asked once
+        ffbs._check_blackdetect_simd()
+        assert len(calls) == 1
+
+    def test_export_edl(self, tmp_path):
+        """
+        Test writing an ffconcat edit list of the content periods
+        """
+        input_file = tmp_path / "it's.mp4"
+        fbs = ffbs(str(input_file))
+        fbs.black_periods = [
+            {"start": 0.0, "end": 5.0, "duration": 5.0},
+            {"start": 10.0, "end": 15.0, "duration": 5.0},
+        ]
+        fbs.content_periods = [
+            {"start": 5.0, "end": 10.0},
+            {"start": 15.0, "end": None},
+        ]
+        fbs.export_edl(str(tmp_path / "x.ffconcat"))
+
+        # the quote in the file name is closed, escaped and reopened
+        assert (tmp_path / "x.ffconcat").read_text() == (
+            "ffconcat version 1.0\n"
+            f"file '{tmp_path}/it'\\''s.mp4'\n"
+            "inpoint 5.0\n"
+            "outpoint 10.0\n"
+            f"file '{tmp_path}/it'\\''s.mp4'\n"
+            "inpoint 15.0\n"
+        )
+
+    def test_emit_edl_cut_during_detection(self, tmp_path):
+        """
+        Test that an edit list cannot be written when cutting during detection
+        """
+        with pytest.raises(RuntimeError, match="cannot be combined with --emit-edl"):
+            run_command(
+                [
+                    "python3",
+                    "-m",
+                    "ffmpeg_black_split",
+                    TEST_FILE,
+                    "--cut-during-detection",
+                    "--emit-edl",
+                    str(tmp_path / "x.ffconcat"),
+                ]
+            )
+        assert not (tmp_path / "x.ffconcat").exists()
+
+    @pytest.mark.parametrize(
+        "accurate_seek, end, output_file, expected_duration",
+        [
+            (True, 9.0, "test_6.0-9.0.mkv", 3.0),
+            # starts at the keyframe at 5 seconds instead
+            (False, 9.0, "test_6.0-9.0.mkv", 4.0),
+            (False, None, "test_6.0-.mkv", 25.0),
+        ],
+    )
+    def test_cut_part_from_file_accurate_seek(
+        self, tmp_path, accurate_seek, end, output_file, expected_duration
+    ):
+        """
+        Test that re-encoded parts end at the end time, with and without accurate seeking
+        """
+        ffbs.cut_part_from_file(
+            TEST_FILE,
+            str(tmp_path),
+            start=6.0,
+            end=end,
+            no_copy=True,
+            accurate_seek=accurate_seek,
+        )
+
+        assert os.listdir(tmp_path) == [output_file]
+        assert get_duration(str(tmp_path / output_file)) == pytest.approx(
+            expected_duration, abs=0.1
+        )